@@ -0,0 +1,364 @@
+"""
+Benchmark.py
+
+Benchmark suite untuk storage engine. Generate tabel sintetis dari Schema lalu ukur
+insert, full scan, selective predicate, point lookup, delete, dan vacuum (defragment)
+lewat StorageEngine. Hasil di dump sebagai JSON supaya bisa dibandingin antar commit.
+Engine dijalanin di storage sementara, storage/catalog.json asli gak disentuh.
+
+Contoh:
+    python Benchmark.py --rows 10000 --output bench.json
+    python Benchmark.py --rows 10000 --baseline bench.json --threshold 0.2
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import statistics
+import string
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, List
+
+from classes.API import StorageEngine
+from classes.Serializer import Serializer
+from classes.Metrics import Metrics
+from classes.globals import CATALOG_FILE
+from classes.DataModels import Schema, DataRetrieval, DataWrite, DataDeletion, Condition, Operation
+from classes.Types import DataType, IntType, FloatType, CharType, VarCharType
+
+DISTRIBUTIONS = ("sequential", "uniform", "zipf", "normal")
+PHASES = ("insert", "full_scan", "selective_predicate", "point_lookup", "delete", "vacuum")
+# Config yang harus sama supaya dua hasil benchmark bisa dibandingin
+COMPARED_CONFIG = ("rows", "columns", "distributions", "seed", "batch_size", "selectivity", "delete_fraction", "cluster_key")
+
+
+class SyntheticDataGenerator:
+    """
+        Generate rows sesuai Schema. Distribusi bisa diatur per kolom:
+            sequential - 0, 1, 2, ... (default untuk kolom int pertama, dianggap key)
+            uniform    - acak uniform di [0, n_rows)
+            zipf       - skewed, nilai kecil jauh lebih sering muncul
+            normal     - gaussian di sekitar n_rows / 2
+        String selalu acak, panjang varchar uniform di [1, max_length]
+    """
+    def __init__(self, schema: Schema, distributions: Dict[str, str] | None = None, seed: int = 0, zipf_s: float = 1.2) -> None:
+        self.schema = schema
+        self.distributions : Dict[str, str] = {}
+        self.zipf_s = zipf_s
+        self.rng = random.Random(seed)
+
+        distributions = distributions or {}
+        key_assigned : bool = False
+        for name, dtype in schema.columns.items():
+            if name in distributions:
+                dist = distributions[name]
+            elif "*" in distributions:
+                dist = distributions["*"]
+            elif isinstance(dtype, IntType) and not key_assigned:
+                dist = "sequential"
+            else:
+                dist = "uniform"
+            if dist not in DISTRIBUTIONS:
+                raise ValueError(f"Unknown distribution '{dist}' for column '{name}'")
+            if isinstance(dtype, IntType) and not key_assigned:
+                key_assigned = True
+            self.distributions[name] = dist
+
+    def generate(self, n_rows: int) -> list[list]:
+        zipf_weights = self.__zipf_weights(n_rows)
+        rows : list[list] = []
+        for i in range(n_rows):
+            row : list = []
+            for name, dtype in self.schema.columns.items():
+                row.append(self.__generate_value(dtype, self.distributions[name], i, n_rows, zipf_weights))
+            rows.append(row)
+        return rows
+
+    def __zipf_weights(self, n_rows: int) -> list[float] | None:
+        if "zipf" not in self.distributions.values():
+            return None
+        # cumulative weights buat random.choices
+        total : float = 0.0
+        cum_weights : list[float] = []
+        for k in range(1, max(n_rows, 1) + 1):
+            total += 1.0 / (k ** self.zipf_s)
+            cum_weights.append(total)
+        return cum_weights
+
+    def __number(self, dist: str, i: int, n_rows: int, zipf_weights: list[float] | None) -> float:
+        if dist == "sequential":
+            return i
+        elif dist == "uniform":
+            return self.rng.uniform(0, n_rows)
+        elif dist == "zipf":
+            return self.rng.choices(range(len(zipf_weights)), cum_weights=zipf_weights)[0]
+        elif dist == "normal":
+            return self.rng.gauss(n_rows / 2, n_rows / 6)
+
+    def __generate_value(self, dtype: DataType, dist: str, i: int, n_rows: int, zipf_weights: list[float] | None) -> Any:
+        if isinstance(dtype, IntType):
+            return max(-2**31, min(2**31 - 1, int(self.__number(dist, i, n_rows, zipf_weights))))
+        elif isinstance(dtype, FloatType):
+            return float(self.__number(dist, i, n_rows, zipf_weights))
+        elif isinstance(dtype, CharType):
+            return self.__random_string(dtype.length)
+        elif isinstance(dtype, VarCharType):
+            return self.__random_string(self.rng.randint(1, dtype.max_length))
+        raise TypeError(f"Unsupported data type {type(dtype).__name__}")
+
+    def __random_string(self, length: int) -> str:
+        return "".join(self.rng.choices(string.ascii_letters, k=length))
+
+
+class Benchmark:
+    """
+        Jalanin workload standar ke satu tabel sintetis sebanyak repeat putaran, tiap putaran tabel dibuat ulang.
+        Waktu tiap fase dilaporin median (seconds) dan min (min_seconds) dari semua putaran.
+    """
+    def __init__(self, schema: Schema, n_rows: int, table: str = "__bench", distributions: Dict[str, str] | None = None,
+                 seed: int = 0, batch_size: int = 1000, repeat: int = 5, selectivity: float = 0.01, delete_fraction: float = 0.1,
+                 profile: bool = False, cluster: bool = False) -> None:
+        self.schema = schema
+        self.n_rows = n_rows
+        self.table = table
+        self.batch_size = batch_size
+        self.repeat = max(1, repeat)
+        self.selectivity = selectivity
+        self.delete_fraction = delete_fraction
+        self.profile = profile
+        self.cluster = cluster
+        self.seed = seed
+        self.deleted : int = 0
+        self.rng = random.Random(seed)
+        self.generator = SyntheticDataGenerator(schema, distributions, seed)
+        self.engine = StorageEngine()
+        # predicate dan lookup pakai kolom int pertama
+        self.key : str = next(name for name, dtype in schema.columns.items() if isinstance(dtype, IntType))
+
+    def run(self) -> Dict:
+        rows = self.generator.generate(self.n_rows)
+        phases : Dict[str, Callable[[], int]] = {
+            "insert": lambda: self.__bench_insert(rows),
+            "full_scan": self.__bench_full_scan,
+            "selective_predicate": self.__bench_selective,
+            "point_lookup": self.__bench_point_lookup,
+            "delete": self.__bench_delete,
+            "vacuum": self.__bench_vacuum,
+        }
+        timings : Dict[str, list[float]] = {phase: [] for phase in PHASES}
+        counts : Dict[str, int] = {}
+        metrics : Dict[str, Dict] = {}
+
+        was_enabled : bool = Metrics.enabled
+        if self.profile:
+            Metrics.enable()
+        try:
+            with temporary_storage():
+                for i in range(self.repeat):
+                    self.rng = random.Random(self.seed + i)
+                    self.engine.create_table(self.table, self.schema, cluster_key=self.key if self.cluster else None)
+                    for phase in PHASES:
+                        if self.profile:
+                            Metrics.reset()
+                        start = time.perf_counter()
+                        counts[phase] = phases[phase]()
+                        timings[phase].append(time.perf_counter() - start)
+                        if self.profile:
+                            metrics[phase] = Metrics.snapshot()   # profile putaran terakhir
+                    self.__drop()
+        finally:
+            Metrics.enabled = was_enabled
+
+        results : Dict[str, Dict] = {}
+        for phase in PHASES:
+            results[phase] = _result(timings[phase], counts[phase])
+            if self.profile:
+                results[phase]["metrics"] = metrics[phase]
+
+        return {
+            "commit": _git_commit(),
+            "timestamp": time.time(),
+            "config": {
+                "rows": self.n_rows,
+                "table": self.table,
+                "columns": [{"name": name, **dtype.to_dict()} for name, dtype in self.schema.columns.items()],
+                "distributions": self.generator.distributions,
+                "seed": self.seed,
+                "batch_size": self.batch_size,
+                "repeat": self.repeat,
+                "selectivity": self.selectivity,
+                "delete_fraction": self.delete_fraction,
+                "profile": self.profile,
+                "cluster_key": self.key if self.cluster else None,
+            },
+            "results": results,
+        }
+
+    def __drop(self) -> None:
+        self.engine.drop_table(self.table)
+        # drop_table cuma hapus dari catalog, file data dihapus manual biar putaran berikutnya mulai kosong
+        for file_path in [f"storage/data/{self.table}.dat", f"storage/data/{self.table}.fsm"]:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def __bench_insert(self, rows: list[list]) -> int:
+        columns = list(self.schema.columns.keys())
+        written : int = 0
+        for i in range(0, len(rows), self.batch_size):
+            written += self.engine.write_block(DataWrite(self.table, columns, [], rows[i : i + self.batch_size]))
+        return written
+
+    def __bench_full_scan(self) -> int:
+        return len(self.engine.read_block(DataRetrieval(self.table, [], [])))
+
+    def __bench_selective(self) -> int:
+        bound : int = max(1, int(self.n_rows * self.selectivity))
+        return len(self.engine.read_block(DataRetrieval(self.table, [], [Condition(self.key, Operation.LT, bound)])))
+
+    def __bench_point_lookup(self) -> int:
+        key : int = self.rng.randrange(max(self.n_rows, 1))
+        return len(self.engine.read_block(DataRetrieval(self.table, [], [Condition(self.key, Operation.EQ, key)])))
+
+    def __bench_delete(self) -> int:
+        bound : int = int(self.n_rows * self.delete_fraction)
+        self.deleted = self.engine.delete_block(DataDeletion(self.table, [Condition(self.key, Operation.LT, bound)]))
+        return self.deleted
+
+    def __bench_vacuum(self) -> int:
+        self.engine.defragment(self.table)
+        return self.n_rows - self.deleted
+
+
+@contextlib.contextmanager
+def temporary_storage() -> Iterator[str]:
+    """
+        Pindah cwd ke temp dir yang isinya storage/ kosong (catalog "{}"), path engine semuanya relatif.
+        Cwd dan cache catalog dikembalikan setelah selesai
+    """
+    cwd : str = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "storage", "data"))
+        with open(os.path.join(tmp, CATALOG_FILE), "w") as f:
+            json.dump({}, f)
+        os.chdir(tmp)
+        Serializer.invalidate_catalog()
+        try:
+            yield tmp
+        finally:
+            os.chdir(cwd)
+            Serializer.invalidate_catalog()
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+        Returns list of regression messages: fase yang median waktunya naik lebih dari threshold (0.1 = 10%).
+        Raise ValueError kalau config kedua hasil beda (hasilnya gak sebanding)
+    """
+    mismatched : List[str] = [
+        key for key in COMPARED_CONFIG
+        if current.get("config", {}).get(key) != baseline.get("config", {}).get(key)
+    ]
+    if mismatched:
+        raise ValueError(f"Benchmark config differs from baseline: {', '.join(mismatched)}")
+
+    regressions : List[str] = []
+    for phase, res in current["results"].items():
+        base = baseline.get("results", {}).get(phase)
+        if not base or base["seconds"] <= 0:
+            continue
+        ratio : float = res["seconds"] / base["seconds"]
+        if ratio > 1 + threshold:
+            regressions.append(f"{phase}: {base['seconds']:.6f}s -> {res['seconds']:.6f}s (+{(ratio - 1) * 100:.1f}%)")
+    return regressions
+
+
+def _result(timings: list[float], n_rows: int) -> Dict:
+    seconds : float = statistics.median(timings)
+    return {
+        "seconds": seconds,
+        "min_seconds": min(timings),
+        "runs": len(timings),
+        "rows": n_rows,
+        "rows_per_sec": n_rows / seconds if seconds > 0 else None,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _parse_distributions(values: List[str]) -> Dict[str, str]:
+    res : Dict[str, str] = {}
+    for value in values:
+        if "=" in value:
+            column, dist = value.split("=", 1)
+            res[column] = dist
+        else:
+            res["*"] = value
+    return res
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="StorageEngine benchmark")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--dist", action="append", default=[],
+                        help=f"distribution, either global or per column (col=dist). One of {', '.join(DISTRIBUTIONS)}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5, help="number of rounds, each phase reports the median")
+    parser.add_argument("--selectivity", type=float, default=0.01)
+    parser.add_argument("--delete-fraction", type=float, default=0.1)
+    parser.add_argument("--profile", action="store_true", help="include per phase I/O/CPU metrics (adds overhead)")
+    parser.add_argument("--cluster", action="store_true", help="cluster the benchmark table on its first int column")
+    parser.add_argument("--output", help="write JSON result to this file (default stdout)")
+    parser.add_argument("--baseline", help="JSON result of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown ratio before failing (default 0.1)")
+    args = parser.parse_args(argv)
+
+    schema = Schema(
+        id=IntType(),
+        name=VarCharType(50),
+        ipk=FloatType()
+    )
+    bench = Benchmark(schema, args.rows, distributions=_parse_distributions(args.dist), seed=args.seed,
+                      batch_size=args.batch_size, repeat=args.repeat,
+                      selectivity=args.selectivity, delete_fraction=args.delete_fraction,
+                      profile=args.profile, cluster=args.cluster)
+    # Engine masih print ke stdout, stdout khusus buat JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        result = bench.run()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        try:
+            regressions = compare(result, baseline, args.threshold)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+        if regressions:
+            print("Regression detected:", file=sys.stderr)
+            for msg in regressions:
+                print(f"  {msg}", file=sys.stderr)
+            return 1
+        print("No regression.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,14 @@
 import os
 from classes.Types import IntType, VarCharType, FloatType, CharType
-from classes.DataModels import Schema
+from classes.DataModels import Schema, DataRetrieval, DataWrite, DataDeletion, Condition, Operation
 from classes.API import StorageEngine
-from classes.globals import CATALOG_FILE
+from classes.IO import IO
+from classes.Serializer import Serializer
+from classes.Metrics import Metrics, QueryProfile
+from classes.Indexing import ClusteredIndex, fsm_path
+import random
+from classes.globals import CATALOG_FILE, BLOCK_SIZE
+from Benchmark import SyntheticDataGenerator, compare, temporary_storage
 
 def test_create_table():
     schemas_file = CATALOG_FILE
@@ -49,6 +55,399 @@ def test_drop_table():
     else:
         print("GAGAL.")
 
+# Test di bawah jalan di storage sementara (temporary_storage), catalog asli gak kesentuh
+
+def test_generator_distributions():
+    schema = Schema(id=IntType(), year=IntType(), nama=VarCharType(10), kode=CharType(3), ipk=FloatType())
+
+    gen = SyntheticDataGenerator(schema)
+    assert gen.distributions == {"id": "sequential", "year": "uniform", "nama": "uniform", "kode": "uniform", "ipk": "uniform"}
+
+    gen = SyntheticDataGenerator(schema, {"*": "normal", "year": "zipf"})
+    assert gen.distributions["id"] == "normal"
+    assert gen.distributions["year"] == "zipf"
+
+    rows = SyntheticDataGenerator(schema, seed=1).generate(50)
+    assert rows == SyntheticDataGenerator(schema, seed=1).generate(50)
+    assert [row[0] for row in rows] == list(range(50))
+    for row in rows:
+        schema.validate_tuple(row)
+
+    try:
+        SyntheticDataGenerator(schema, {"ipk": "exponential"})
+        assert False, "unknown distribution should raise"
+    except ValueError:
+        pass
+
+def test_generator_int_clamping():
+    gen = SyntheticDataGenerator(Schema(id=IntType()))
+    generate_value = gen._SyntheticDataGenerator__generate_value
+    assert generate_value(IntType(), "sequential", 2**40, 2**40, None) == 2**31 - 1
+    assert generate_value(IntType(), "sequential", -2**40, 2**40, None) == -2**31
+
+def test_compare():
+    config = {"rows": 100, "columns": [], "distributions": {}, "seed": 0, "batch_size": 10,
+              "selectivity": 0.01, "delete_fraction": 0.1, "cluster_key": None}
+    baseline = {"config": config, "results": {"insert": {"seconds": 1.0}, "full_scan": {"seconds": 1.0}}}
+    current = {"config": dict(config), "results": {"insert": {"seconds": 1.05}, "full_scan": {"seconds": 1.5}}}
+
+    regressions = compare(current, baseline, 0.1)
+    assert len(regressions) == 1 and regressions[0].startswith("full_scan")
+    assert compare(current, baseline, 0.6) == []
+
+    current["config"]["rows"] = 200
+    try:
+        compare(current, baseline, 0.1)
+        assert False, "different config should not be compared"
+    except ValueError as e:
+        assert "rows" in str(e)
+
+def test_io_write_does_not_truncate():
+    with temporary_storage():
+        io = IO("storage/data/io.dat")
+        assert io.read(0) == b""
+        assert io.get_last_block_index() == -1
+
+        assert io.write(0, b"a") == BLOCK_SIZE
+        assert io.write(1, b"b") == BLOCK_SIZE
+        assert io.read(0)[:1] == b"a"
+        assert io.read(1)[:1] == b"b"
+
+        # Data lebih dari satu blok di pad sampai kelipatan BLOCK_SIZE
+        assert io.write(2, b"x" * (BLOCK_SIZE + 100)) == 2 * BLOCK_SIZE
+        assert io.get_last_block_index() == 3
+        assert io.read(4) == b""
+
+def test_serializer_padding():
+    with temporary_storage():
+        # 3 header + 4 int + 1015 char = 1022 bytes, sisa 2 byte padding di blok
+        StorageEngine().create_table("pad", Schema(id=IntType(), kode=CharType(1015)))
+        serializer = Serializer()
+        serializer.load_schema("pad")
+
+        data = serializer.serialize([[7, "ab"]])
+        assert len(data) == BLOCK_SIZE - 2
+        assert serializer.deserialize(data.ljust(BLOCK_SIZE, b"\x00")) == [[7, "ab".ljust(1015)]]
+
+def test_multi_block_rows():
+    with temporary_storage():
+        manager = StorageEngine()
+        manager.create_table("big", Schema(id=IntType(), isi=VarCharType(3000)))
+        rows = [[1, "a" * 2500], [2, "b"], [3, "c" * 1500]]
+        assert manager.write_block(DataWrite("big", ["id", "isi"], [], rows)) == 3
+        assert manager.read_block(DataRetrieval("big", [], [])) == rows
+
+def test_delete_and_defragment():
+    with temporary_storage():
+        manager = StorageEngine()
+        manager.create_table("mhs", Schema(id=IntType(), nama=VarCharType(20)))
+        for batch in range(3):  # tiap write_block mulai di blok baru
+            rows = [[batch * 10 + i, f"mhs{i}"] for i in range(10)]
+            manager.write_block(DataWrite("mhs", ["id", "nama"], [], rows))
+        io = IO("storage/data/mhs.dat")
+        assert io.get_last_block_index() == 2
+
+        assert manager.delete_block(DataDeletion("mhs", [Condition("id", Operation.LT, 15)])) == 15
+        before = manager.read_block(DataRetrieval("mhs", [], []))
+        assert [row[0] for row in before] == list(range(15, 30))
+
+        assert manager.defragment("mhs")
+        assert io.get_last_block_index() == 0
+        assert manager.read_block(DataRetrieval("mhs", [], [])) == before
+        assert not os.path.exists("storage/data/mhs.dat.tmp")
+
+def test_defragment_failure_keeps_data():
+    with temporary_storage():
+        manager = StorageEngine()
+        manager.create_table("mhs", Schema(id=IntType()))
+        manager.write_block(DataWrite("mhs", ["id"], [], [[i] for i in range(10)]))
+        manager.delete_block(DataDeletion("mhs", [Condition("id", Operation.LT, 5)]))
+        with open("storage/data/mhs.dat", "rb") as f:
+            before = f.read()
+
+        # Gagal di tengah rewrite, file data asli gak boleh hilang
+        pack_rows = StorageEngine._pack_rows
+        def failing_pack_rows(*args, **kwargs):
+            raise RuntimeError("disk full")
+        StorageEngine._pack_rows = failing_pack_rows
+        try:
+            manager.defragment("mhs")
+            assert False, "defragment should propagate the failure"
+        except RuntimeError:
+            pass
+        finally:
+            StorageEngine._pack_rows = pack_rows
+
+        with open("storage/data/mhs.dat", "rb") as f:
+            assert f.read() == before
+        assert manager.read_block(DataRetrieval("mhs", ["id"], [])) == [[i] for i in range(5, 10)]
+
+        # Tabel yang semua row-nya dihapus tetap punya file data (kosong) setelah vacuum
+        manager.delete_block(DataDeletion("mhs", [Condition("id", Operation.GTE, 0)]))
+        assert manager.defragment("mhs")
+        assert os.path.getsize("storage/data/mhs.dat") == 0
+        assert manager.read_block(DataRetrieval("mhs", [], [])) == []
+
+def test_metrics_disabled():
+    with temporary_storage():
+        manager = StorageEngine()
+        manager.create_table("mhs", Schema(id=IntType()))
+        Metrics.disable()
+        manager.write_block(DataWrite("mhs", ["id"], [], [[1]]))
+        assert manager.last_profile is None
+        manager.read_block(DataRetrieval("mhs", [], []))
+        assert manager.last_profile is None
+
+def test_metrics_counters():
+    with temporary_storage():
+        manager = StorageEngine()
+        manager.create_table("mhs", Schema(id=IntType(), nama=CharType(10)))
+        Metrics.enable()
+        Metrics.reset()
+        try:
+            # 2 batch -> 2 blok, tiap row 3 + 4 + 10 = 17 bytes
+            for batch in range(2):
+                manager.write_block(DataWrite("mhs", ["id", "nama"], [], [[batch * 10 + i, "abcdefghij"] for i in range(10)]))
+                profile = manager.last_profile
+                assert isinstance(profile, QueryProfile)
+                assert profile.rows_written == 10
+                assert profile.blocks_written == 1
+                assert profile.bytes_written == BLOCK_SIZE
+
+            manager.read_block(DataRetrieval("mhs", [], [Condition("id", Operation.LT, 5)]))
+            profile = manager.last_profile
+            assert profile.blocks_read == 2
+            assert profile.bytes_read == 2 * BLOCK_SIZE
+            assert profile.bytes_decoded == 2 * BLOCK_SIZE
+            assert profile.rows_examined == 20
+            assert profile.rows_returned == 5
+            assert profile.cache_hits + profile.cache_misses == 1
+            assert {"io_read", "deserialize", "predicate", "total"} <= set(profile.timings)
+
+            manager.delete_block(DataDeletion("mhs", [Condition("id", Operation.GTE, 15)]))
+            profile = manager.last_profile
+            assert profile.rows_deleted == 5
+            assert profile.rows_returned == 0
+            assert profile.blocks_written == 1
+
+            snapshot = Metrics.snapshot()
+            assert snapshot["queries"] == {"write_block": 2, "read_block": 1, "delete_block": 1}
+            assert snapshot["rows_written"] == 20
+            assert snapshot["rows_deleted"] == 5
+            assert snapshot["rows_returned"] == 5
+            assert snapshot["blocks_read"] == 4
+        finally:
+            Metrics.disable()
+            Metrics.reset()
+
+def test_catalog_cache_invalidation():
+    with temporary_storage():
+        manager = StorageEngine()
+        manager.create_table("mhs", Schema(id=IntType()))
+
+        first = QueryProfile("test", "mhs")
+        Serializer(first).load_schema("mhs")
+        second = QueryProfile("test", "mhs")
+        Serializer(second).load_schema("mhs")
+        assert second.cache_hits == 1 and second.cache_misses == 0
+
+        manager.set_index("mhs", "id", "clustered")
+        serializer = Serializer()
+        serializer.load_schema("mhs")
+        assert serializer.schema["cluster_key"] == "id"
+
+        manager.drop_table("mhs")
+        try:
+            Serializer().load_schema("mhs")
+            assert False, "dropped table should not be in cached catalog"
+        except KeyError:
+            pass
+
+def test_clustered_matches_heap():
+    rng = random.Random(28)
+    schema = Schema(id=IntType(), v=IntType(), nama=VarCharType(40))
+    with temporary_storage():
+        manager = StorageEngine()
+        manager.create_table("heap", schema)
+        manager.create_table("clus", schema, cluster_key="id")
+        Metrics.enable()
+        try:
+            for step in range(60):
+                op = rng.random()
+                if op < 0.6:
+                    rows = [[rng.randrange(2000), rng.randrange(50), "x" * rng.randint(1, 40)] for _ in range(rng.randint(1, 60))]
+                    for table in ["heap", "clus"]:
+                        assert manager.write_block(DataWrite(table, ["id", "v", "nama"], [], rows)) == len(rows)
+                elif op < 0.85:
+                    # 1-3 kondisi (di OR), campur cluster key dan kolom lain
+                    conditions = []
+                    for _ in range(rng.randint(1, 3)):
+                        if rng.random() < 0.7:
+                            operation = rng.choice([Operation.EQ, Operation.NEQ, Operation.LT, Operation.LTE, Operation.GT, Operation.GTE])
+                            conditions.append(Condition("id", operation, rng.randrange(2000)))
+                        else:
+                            conditions.append(Condition("v", Operation.EQ, rng.randrange(50)))
+                    deleted = manager.delete_block(DataDeletion("heap", conditions))
+                    assert manager.delete_block(DataDeletion("clus", conditions)) == deleted
+                else:
+                    manager.defragment("clus")
+
+                lo = rng.randrange(2000)
+                hi = lo + rng.randrange(200)
+                conditions = [Condition("id", Operation.GTE, lo), Condition("id", Operation.LTE, hi)]
+                expected = manager.read_block(DataRetrieval("heap", [], conditions))
+                result = manager.read_block(DataRetrieval("clus", [], conditions))
+                assert sorted(result) == sorted(expected)
+                assert [row[0] for row in result] == sorted(row[0] for row in result)
+
+                # Cuma chunk yang range key-nya overlap [lo, hi] yang dibaca
+                index = ClusteredIndex("storage/data/clus.dat", "id", 0)
+                overlapping = sum(entry[3] for entry in index.blocks if entry[0] <= hi and entry[1] >= lo)
+                assert manager.last_profile.blocks_read == overlapping
+
+            all_rows = manager.read_block(DataRetrieval("clus", [], []))
+            assert sorted(all_rows) == sorted(manager.read_block(DataRetrieval("heap", [], [])))
+            assert [row[0] for row in all_rows] == sorted(row[0] for row in all_rows)
+
+            conditions = [Condition("id", Operation.EQ, all_rows[len(all_rows) // 2][0])]
+            manager.read_block(DataRetrieval("heap", [], conditions))
+            heap_blocks = manager.last_profile.blocks_read
+            manager.read_block(DataRetrieval("clus", [], conditions))
+            assert manager.last_profile.blocks_read <= 2 < heap_blocks
+        finally:
+            Metrics.disable()
+            Metrics.reset()
+
+def test_clustered_delete_multiple_conditions():
+    schema = Schema(id=IntType(), v=IntType())
+    rows = [[i, i % 13] for i in range(300)]
+    cases = [
+        [Condition("id", Operation.LT, 5), Condition("id", Operation.GT, 290)],
+        [Condition("id", Operation.LT, 10), Condition("v", Operation.EQ, 3)],
+        [Condition("id", Operation.EQ, 50), Condition("id", Operation.EQ, 250)],
+        [Condition("id", Operation.NEQ, 7)],
+    ]
+    with temporary_storage():
+        manager = StorageEngine()
+        for case, conditions in enumerate(cases):
+            manager.create_table(f"heap{case}", schema)
+            manager.create_table(f"clus{case}", schema, cluster_key="id")
+            for table in [f"heap{case}", f"clus{case}"]:
+                manager.write_block(DataWrite(table, ["id", "v"], [], rows))
+
+            deleted = manager.delete_block(DataDeletion(f"heap{case}", conditions))
+            assert manager.delete_block(DataDeletion(f"clus{case}", conditions)) == deleted
+            assert manager.read_block(DataRetrieval(f"clus{case}", [], [])) == manager.read_block(DataRetrieval(f"heap{case}", [], []))
+
+def test_clustered_page_split_and_free_list():
+    with temporary_storage():
+        manager = StorageEngine()
+        # 3 header + 4 int + 100 char = 107 bytes, 9 row per blok
+        manager.create_table("clus", Schema(id=IntType(), isi=CharType(100)), cluster_key="id")
+        io = IO("storage/data/clus.dat")
+
+        manager.write_block(DataWrite("clus", ["id", "isi"], [], [[i, "a"] for i in range(9)]))
+        assert io.get_last_block_index() == 0
+
+        # Blok penuh, insert di tengah -> split rata jadi 2 chunk
+        manager.write_block(DataWrite("clus", ["id", "isi"], [], [[4, "b"]]))
+        index = ClusteredIndex("storage/data/clus.dat", "id", 0)
+        assert [(entry[0], entry[1], entry[2]) for entry in index.blocks] == [(0, 4, 0), (4, 8, 1)]
+
+        # Chunk kedua kosong -> masuk free list
+        assert manager.delete_block(DataDeletion("clus", [Condition("id", Operation.GTE, 4)])) == 6
+        index = ClusteredIndex("storage/data/clus.dat", "id", 0)
+        assert len(index.blocks) == 1
+        assert index.free == [[1, 1]]
+
+        # Split berikutnya pakai blok dari free list, file gak nambah
+        manager.write_block(DataWrite("clus", ["id", "isi"], [], [[i, "c"] for i in range(6)]))
+        index = ClusteredIndex("storage/data/clus.dat", "id", 0)
+        assert index.free == []
+        assert sorted(entry[2] for entry in index.blocks) == [0, 1]
+        assert io.get_last_block_index() == 1
+        assert [row[0] for row in manager.read_block(DataRetrieval("clus", ["id"], []))] == [0, 0, 1, 1, 2, 2, 3, 3, 4, 5]
+
+def test_free_list_coalesce():
+    with temporary_storage():
+        index = ClusteredIndex("storage/data/x.dat", "id", 0)
+        index.release(5, 1)
+        index.release(3, 1)
+        assert index.free == [[3, 1], [5, 1]]
+        index.release(4, 1)
+        assert index.free == [[3, 3]]
+
+        assert index.allocate(3, 99) == 3
+        assert index.free == []
+
+        index.release(10, 2)
+        assert index.allocate(1, 99) == 10
+        assert index.free == [[11, 1]]
+        assert index.allocate(5, 99) == 99
+
+def test_clustered_missing_fsm_rebuild():
+    with temporary_storage():
+        manager = StorageEngine()
+        manager.create_table("clus", Schema(id=IntType()), cluster_key="id")
+        keys = list(range(500))
+        random.Random(1).shuffle(keys)
+        for i in range(0, 500, 100):
+            manager.write_block(DataWrite("clus", ["id"], [], [[key] for key in keys[i : i + 100]]))
+
+        # Tanpa FSM, read/write/delete jalan kayak heap dan file data gak di rewrite
+        os.remove(fsm_path("storage/data/clus.dat"))
+        with open("storage/data/clus.dat", "rb") as f:
+            before = f.read()
+        result = manager.read_block(DataRetrieval("clus", ["id"], [Condition("id", Operation.GTE, 100), Condition("id", Operation.LT, 120)]))
+        assert sorted(result) == [[key] for key in range(100, 120)]
+        with open("storage/data/clus.dat", "rb") as f:
+            assert f.read() == before
+        assert not os.path.exists(fsm_path("storage/data/clus.dat"))
+
+        manager.write_block(DataWrite("clus", ["id"], [], [[1000]]))
+        assert manager.delete_block(DataDeletion("clus", [Condition("id", Operation.LT, 10)])) == 10
+        assert not os.path.exists(fsm_path("storage/data/clus.dat"))
+
+        # defragment recluster dan bangun ulang FSM
+        assert manager.defragment("clus")
+        assert os.path.exists(fsm_path("storage/data/clus.dat"))
+        assert [row[0] for row in manager.read_block(DataRetrieval("clus", ["id"], []))] == list(range(10, 500)) + [1000]
+
+def test_set_index_reclusters():
+    with temporary_storage():
+        manager = StorageEngine()
+        manager.create_table("mhs", Schema(id=IntType(), nama=VarCharType(20)))
+        for batch in range(5):
+            manager.write_block(DataWrite("mhs", ["id", "nama"], [], [[500 - batch * 100 - i, "mhs"] for i in range(100)]))
+
+        manager.set_index("mhs", "id", "clustered")
+        assert [row[0] for row in manager.read_block(DataRetrieval("mhs", ["id"], []))] == list(range(1, 501))
+        index = ClusteredIndex("storage/data/mhs.dat", "id", 0)
+        assert [entry[2] for entry in index.blocks] == list(range(len(index.blocks)))
+
+        for column, index_type in [("id", "hash"), ("ipk", "clustered")]:
+            try:
+                manager.set_index("mhs", column, index_type)
+                assert False, "should raise ValueError"
+            except ValueError:
+                pass
+
+def test_fsm_removed_on_drop():
+    schema = Schema(id=IntType())
+    with temporary_storage():
+        manager = StorageEngine()
+        manager.create_table("mhs", schema, cluster_key="id")
+        manager.write_block(DataWrite("mhs", ["id"], [], [[i] for i in range(10)]))
+        manager.drop_table("mhs")
+        assert not os.path.exists(fsm_path("storage/data/mhs.dat"))
+
+        # Drop masih soft delete, row di file data tetap kebaca setelah tabel dibuat ulang
+        manager.create_table("mhs", schema)
+        manager.write_block(DataWrite("mhs", ["id"], [], [[i] for i in range(10, 20)]))
+        manager.drop_table("mhs")
+        manager.create_table("mhs", schema, cluster_key="id")
+        assert manager.read_block(DataRetrieval("mhs", ["id"], [])) == [[i] for i in range(20)]
+
 if __name__ == "__main__":
     # test_create_table()
     test_drop_table()
\ No newline at end of file
@@ -5,13 +5,17 @@ The main class that other components will call. Contains the storage engine clas
 """
 
 from classes.IO import IO
+from classes.Indexing import ClusteredIndex, fsm_path
 from classes.Serializer import Serializer, SerializerIncompleteBlockException
 from classes.DataModels import DataRetrieval, DataWrite, DataDeletion, Condition, Statistic, Operation
 from classes.DataModels import Schema
+from classes.Metrics import Metrics, QueryProfile
 from classes.globals import CATALOG_FILE, BLOCK_SIZE
-from typing import Dict, Iterator
+from typing import Any, Dict, Iterator
 import json
 import operator
+import os
+import time
 
 class StorageEngine:
     operation_funcs : Dict = {
@@ -22,29 +26,33 @@ class StorageEngine:
         Operation.LT: operator.lt,
         Operation.LTE: operator.le,
     }
+    # Profile dari panggilan terakhir, None kalau Metrics disabled
+    last_profile : QueryProfile | None = None
 
     def read_block(self, data_retrieval: DataRetrieval) -> list[list]:
         """
         Returns rows that satisfy given conditions
         """
         table: str = data_retrieval.table
-        io = IO(table)
-        serializer = Serializer()
+        profile = Metrics.start("read_block", table)
+        serializer = Serializer(profile)
         serializer.load_schema(table)
+        io = IO(serializer.schema["file_path"], profile)
 
         mappingCol = self.__create_column_mapping(serializer.schema["columns"])
         res: list[list] = []  
 
-        idx : int = 0
-        #TODO: Implement kalau ada index di colnya
-
-
-        while True:
-            chunk: bytes = io.read(idx)
-            if not chunk:  # EOF
-                break
-
-            data = serializer.deserialize(chunk)
+        #TODO: Implement kalau ada index (selain clustered) di colnya
+        index = self.__clustered_index(io, serializer)
+        if index is not None:
+            block_idx_gen = StorageEngine._clustered_search(index, data_retrieval.conditions)
+        else:
+            block_idx_gen = StorageEngine._sequential_search(io)
+
+        for _, _, data in StorageEngine._read_chunks(io, serializer, block_idx_gen):
+            if profile is not None:
+                profile.rows_examined += len(data)
+                start = time.perf_counter()
             for row in data:
                 passed : bool = True
                 for condition in data_retrieval.conditions:
@@ -62,17 +70,21 @@ class StorageEngine:
                         res.append(projected_row)
                     else:
                         res.append(row)
+            if profile is not None:
+                profile.add_time("predicate", time.perf_counter() - start)
 
-            idx += 1
-
+        if profile is not None:
+            profile.rows_returned = len(res)
+        self.last_profile = Metrics.finish(profile)
         return res  
     
-    def write_block(data_write: DataWrite) -> int:
+    def write_block(self, data_write: DataWrite) -> int:
         """
             Returns number of rows affected
         """
         table: str = data_write.table
-        serializer = Serializer()
+        profile = Metrics.start("write_block", table)
+        serializer = Serializer(profile)
         serializer.load_schema(table)
 
         inserted_values : list = []
@@ -84,7 +96,7 @@ class StorageEngine:
             sch_idx : int = 0
             while sch_idx < len(schema_columns):
                 col = schema_columns[sch_idx]
-                if col["name"] == inserted_columns[i_idx]:  # Provided column
+                if i_idx < len(inserted_columns) and col["name"] == inserted_columns[i_idx]:  # Provided column
                     new_row.append(row[i_idx])
                     i_idx += 1
 
@@ -102,100 +114,119 @@ class StorageEngine:
                 sch_idx += 1
             inserted_values.append(new_row)
 
-        io = IO(serializer.schema["file_path"])
-        last_block_idx : int = 1 + io.get_last_block_index()
-        res : int = 0
-        written_block_length : int = 0
-        block : bytes = b""
-        block_rows : int = 0
-        def flush_block():
-            nonlocal last_block_idx, res, written_block_length, block, block_rows
-            
-            # TODO: Update index here
-            
-            length = io.write(last_block_idx, block)
-            last_block_idx += length // BLOCK_SIZE   # some rows exceed block size
-            res += block_rows
-
-            written_block_length = 0
-            block = b""
-            block_rows = 0
-        # Serialize per row: pack dalam satu blok dulu, lalu ke blok baru kalau melebihi block size
-        row : int = 0
-        while row < len(inserted_values):
-            serialized_data : bytes = serializer.serialize([inserted_values[row]])
-            serialized_data_length : int = len(serialized_data)
-            # TODO: Check for unique/primary key constraint violation here with index
-
-            if written_block_length + serialized_data_length > BLOCK_SIZE:
-                flush_block()
-
-            written_block_length += serialized_data_length
-            block += serialized_data
-            block_rows += 1
-
-            if row == len(data_write.new_value) - 1 and written_block_length > 0:
-                flush_block()
-            row += 1
+        io = IO(serializer.schema["file_path"], profile)
+        index = self.__clustered_index(io, serializer)
+        if index is not None:
+            res : int = StorageEngine._insert_clustered(io, serializer, index, inserted_values)
+        else:
+            res : int = StorageEngine._pack_rows(io, serializer, inserted_values, 1 + io.get_last_block_index())
 
+        if profile is not None:
+            profile.rows_written = res
+        self.last_profile = Metrics.finish(profile)
         return res
 
 
-    def delete_block(data_deletion: DataDeletion) -> int:
+    def delete_block(self, data_deletion: DataDeletion) -> int:
         """
             Returns number of rows affected
         """
         table: str = data_deletion.table
-        io = IO(table)
-        serializer = Serializer()
+        profile = Metrics.start("delete_block", table)
+        serializer = Serializer(profile)
         serializer.load_schema(table)
+        io = IO(serializer.schema["file_path"], profile)
 
+        mappingCol = self.__create_column_mapping(serializer.schema["columns"])
         res : int = 0
         
-        # TODO: Algorithm beda kalau ada indeks
-        block_idx_gen = StorageEngine._sequential_search(io)
-        idx = next(block_idx_gen, None)
-        while idx is not None:
-            try:
-                block = io.read(idx)
-            except SerializerIncompleteBlockException as e:
-                for _ in range(e.additional_needed_blocks):
-                    idx = next(block_idx_gen, None)
-                    if idx is None: # Abnormal
-                        return res
-                    block += io.read(idx)
-
-            rows = serializer.deserialize(block)
+        index = self.__clustered_index(io, serializer)
+        if index is not None:
+            # Kondisi delete di OR (row kehapus kalau cocok salah satu kondisi)
+            block_idx_gen = StorageEngine._clustered_search(index, data_deletion.conditions, match_all=False)
+            positions : Dict[int, int] = index.positions()
+            emptied : list[int] = []
+        else:
+            block_idx_gen = StorageEngine._sequential_search(io)
+
+        for idx, n_blocks, rows in StorageEngine._read_chunks(io, serializer, block_idx_gen):
             flag_delete = [False] * len(rows)
+            if profile is not None:
+                profile.rows_examined += len(rows)
+                start = time.perf_counter()
 
             for condition in data_deletion.conditions:
-                colIdx : int = serializer.schema["columns"].find(condition.column)
+                colIdx : int = mappingCol[condition.column]
                 func = StorageEngine.operation_funcs[condition.operation]
                 for irow, row in enumerate(rows):
                     if flag_delete[irow]:
                         continue
                     if func(row[colIdx], condition.operand):
                         flag_delete[irow] = True
+            if profile is not None:
+                profile.add_time("predicate", time.perf_counter() - start)
+
+            deleted : int = sum(flag_delete)
+            if deleted == 0:
+                continue
 
-            # TODO: Update index
-            
             new_rows = []
             for irow, row in enumerate(rows):
                 if not flag_delete[irow]:
                     new_rows.append(row)
-            res += sum(flag_delete)
+            res += deleted
+            # Tulis ulang seluruh chunk, blok lanjutan yang kosong jadi padding
             new_block = serializer.serialize(new_rows)
-            io.write(new_block)
-            idx = next(block_idx_gen, None)
-        
+            io.write(idx, new_block.ljust(n_blocks * BLOCK_SIZE, b'\x00'))
+
+            if index is not None and idx in positions:
+                pos : int = positions[idx]
+                if new_rows:
+                    index.blocks[pos] = index.entry(new_rows, idx, index.blocks[pos][3], len(new_block))
+                else:  # chunk kosong, masuk free list setelah loop (posisi entry jangan geser selama scan)
+                    emptied.append(pos)
+
+        if index is not None and res > 0:
+            for pos in emptied:
+                index.release(index.blocks[pos][2], index.blocks[pos][3])
+            emptied_set : set = set(emptied)
+            index.blocks = [entry for pos, entry in enumerate(index.blocks) if pos not in emptied_set]
+            index.save()
+        if profile is not None:
+            profile.rows_deleted = res
+        self.last_profile = Metrics.finish(profile)
         return res
 
 
-    def set_index(table: str, column:str, index_type: str) -> None:
-        pass
+    def set_index(self, table: str, column:str, index_type: str) -> None:
+        """
+            index_type "clustered": tabel di recluster berdasarkan column
+        """
+        if index_type != "clustered":
+            raise ValueError(f"[StorageManager] Index type '{index_type}' is not supported")
+
+        with open(CATALOG_FILE, "r") as f:
+            data = json.load(f)
+        if column not in [col["name"] for col in data[table]["columns"]]:
+            raise ValueError(f"[StorageManager] Column '{column}' not found in table '{table}'")
+
+        data[table]["cluster_key"] = column
+        with open(CATALOG_FILE, "w") as f:
+            json.dump(data, f, indent=2)
+        Serializer.invalidate_catalog()
+
+        # Data lama masih urutan heap, sort ulang sekalian bangun FSM
+        self.defragment(table)
 
     # TODO: create sama drop masih soft delete (fileny gak di delete)
-    def create_table(self, table_name: str, schema: Schema) -> bool:
+    def create_table(self, table_name: str, schema: Schema, cluster_key: str | None = None) -> bool:
+        """
+            cluster_key - kalau diisi, row disimpan terurut berdasarkan kolom ini (clustered table)
+        """
+        if cluster_key is not None and cluster_key not in schema.columns:
+            print(f"Cluster key {cluster_key} not found in schema.")
+            return False
+
         column_list = [
             {"name":name, **dtype.to_dict()} for name, dtype in schema.columns.items()
         ]
@@ -205,18 +236,25 @@ class StorageEngine:
             "row_size": schema.size,
             "columns": column_list
         }
+        if cluster_key is not None:
+            new_schema["cluster_key"] = cluster_key
+            # FSM sisa tabel lama dengan nama yang sama gak boleh kepake, dibangun ulang dari file data
+            if os.path.exists(fsm_path(new_schema["file_path"])):
+                os.remove(fsm_path(new_schema["file_path"]))
         
         try:
             data = json.load(open(CATALOG_FILE, "r"))
             data[table_name] = new_schema
             with open(CATALOG_FILE, "w") as f:
                 json.dump(data, f, indent=2)
+            Serializer.invalidate_catalog()
             return True
         
         except FileNotFoundError:
             print(f"File not found. Creating a new one with 'enrollment' table.")
             with open(CATALOG_FILE, 'w') as f:
                 json.dump({table_name: new_schema}, f, indent=2)
+            Serializer.invalidate_catalog()
             return True
 
         except Exception as e:
@@ -229,6 +267,9 @@ class StorageEngine:
                 data = json.load(f)
 
             if table_name in data:
+                # File data masih soft delete, tapi FSM dihapus biar gak kepake tabel baru dengan nama sama
+                if os.path.exists(fsm_path(data[table_name]["file_path"])):
+                    os.remove(fsm_path(data[table_name]["file_path"]))
                 del data[table_name]
             else:
                 print("Table not found.")
@@ -236,6 +277,7 @@ class StorageEngine:
             
             with open(CATALOG_FILE, "w") as f:
                 json.dump(data, f, indent=2)
+            Serializer.invalidate_catalog()
             print(f"Table {table_name} dropped successfully.")
             return True
         except FileNotFoundError:
@@ -245,8 +287,24 @@ class StorageEngine:
 
 
     # secara otomatis bakal ngelakuin vacuuming juga
-    def defragment(table: str) -> bool:
-        pass
+    def defragment(self, table: str) -> bool:
+        """
+            Full rewrite: baca semua row yang masih hidup lalu pack ulang dari blok 0.
+            Clustered table sekalian di recluster, blok kembali contiguous sesuai urutan key
+        """
+        profile = Metrics.start("defragment", table)
+        serializer = Serializer(profile)
+        serializer.load_schema(table)
+        io = IO(serializer.schema["file_path"], profile)
+
+        index = self.__clustered_index(io, serializer, allow_missing=True)
+        examined, written = StorageEngine._recluster(io, serializer, index)
+
+        if profile is not None:
+            profile.rows_examined = examined
+            profile.rows_written = written
+        self.last_profile = Metrics.finish(profile)
+        return True
 
     def get_stats(table: str = "all") -> Statistic:
         """
@@ -261,6 +319,157 @@ class StorageEngine:
             mapping[col["name"]] = i
         return mapping
 
+    def __clustered_index(self, file_io: IO, serializer: Serializer, allow_missing: bool = False) -> ClusteredIndex | None:
+        """
+            Returns ClusteredIndex kalau tabel punya cluster key, None kalau heap biasa.
+            Kalau FSM hilang padahal file data ada isinya, juga None: read/write/delete jalan kayak heap
+            (file data gak disentuh) sampai defragment atau set_index bangun ulang FSM-nya
+        """
+        cluster_key : str | None = serializer.schema.get("cluster_key")
+        if cluster_key is None:
+            return None
+
+        mappingCol = self.__create_column_mapping(serializer.schema["columns"])
+        index = ClusteredIndex(serializer.schema["file_path"], cluster_key, mappingCol[cluster_key])
+        if not allow_missing and not index.exists and file_io.get_last_block_index() >= 0:
+            return None
+        return index
+
+    def _split_chunks(serializer: Serializer, rows: list[list], balanced: bool = False, records: list[bytes] | None = None) -> Iterator[tuple[bytes, list[list]]]:
+        """
+        Serialize per row lalu pack ke chunk: isi satu blok dulu, lalu ke blok baru kalau melebihi block size.
+        balanced - bagi rata ke jumlah blok minimum (buat page split), bukan isi penuh dari depan
+        records - hasil serialize tiap row kalau sudah ada (sejajar dengan rows)
+        """
+        serialized : Iterator[bytes] = iter(records) if records is not None else (serializer.serialize([row]) for row in rows)
+        fill : int = BLOCK_SIZE
+        if balanced:
+            serialized = list(serialized)
+            total : int = sum(len(data) for data in serialized)
+            n_blocks : int = max(1, (total + BLOCK_SIZE - 1) // BLOCK_SIZE)
+            fill = (total + n_blocks - 1) // n_blocks
+
+        block : list[bytes] = []
+        block_length : int = 0
+        block_rows : list[list] = []
+        for row, serialized_data in zip(rows, serialized):
+            # TODO: Check for unique/primary key constraint violation here with index
+            if block_length > 0 and (block_length + len(serialized_data) > BLOCK_SIZE or block_length >= fill):
+                yield b"".join(block), block_rows
+                block = []
+                block_length = 0
+                block_rows = []
+            block.append(serialized_data)
+            block_length += len(serialized_data)
+            block_rows.append(row)
+
+        if block_length > 0:
+            yield b"".join(block), block_rows
+
+    def _pack_rows(file_io: IO, serializer: Serializer, rows: list[list], start_block_idx: int, index: ClusteredIndex | None = None) -> int:
+        """
+        Serialize rows dan tulis ke file mulai dari start_block_idx, returns number of rows written.
+        Kalau index diisi, tiap chunk yang ditulis dicatat di FSM
+        """
+        last_block_idx : int = start_block_idx
+        res : int = 0
+        for block, block_rows in StorageEngine._split_chunks(serializer, rows):
+            length = file_io.write(last_block_idx, block)
+            if index is not None:
+                index.blocks.append(index.entry(block_rows, last_block_idx, length // BLOCK_SIZE, len(block)))
+            last_block_idx += length // BLOCK_SIZE   # some rows exceed block size
+            res += len(block_rows)
+        return res
+
+    def _insert_clustered(file_io: IO, serializer: Serializer, index: ClusteredIndex, rows: list[list]) -> int:
+        """
+        Insert ke clustered table: tiap row masuk ke chunk yang range key-nya cocok (lihat FSM).
+        Kalau chunk penuh, page split: chunk pertama tetap di tempat, sisanya ke blok kosong dari FSM atau akhir file.
+        Returns number of rows written
+        """
+        key_idx : int = index.key_idx
+        rows = sorted(rows, key=lambda row: row[key_idx])
+        groups : Dict[int, list[list]] = index.group(rows)
+
+        res : int = 0
+        # Dari posisi paling belakang supaya split gak menggeser posisi group lain
+        for pos in sorted(groups, reverse=True):
+            new_rows : list[list] = groups[pos]
+            old_entry : list | None = index.blocks[pos] if pos >= 0 else None
+            existing : list[list] = []
+            existing_records : list[bytes] = []
+            if old_entry is not None:
+                block_idx, n_blocks = old_entry[2], old_entry[3]
+                chunk : bytes = b"".join(file_io.read(i) for i in range(block_idx, block_idx + n_blocks))
+                # Row lama cuma perlu key-nya, decode sampai kolom cluster key aja
+                existing = serializer.deserialize(chunk, existing_records, key_idx + 1)
+
+            # Row lama ditulis ulang pakai raw bytes-nya, cuma row baru yang di serialize
+            merged_pairs = sorted(
+                list(zip(existing, existing_records)) + [(row, serializer.serialize([row])) for row in new_rows],
+                key=lambda pair: pair[0][key_idx]
+            )
+            merged : list[list] = [row for row, _ in merged_pairs]
+            merged_records : list[bytes] = [record for _, record in merged_pairs]
+
+            # Append di ujung kanan (key naik terus) isi blok penuh, selain itu split rata biar ada ruang buat insert berikutnya
+            appending : bool = old_entry is None or (pos == len(index.blocks) - 1 and new_rows[0][key_idx] >= old_entry[1])
+            reused : bool = False
+            new_entries : list[list] = []
+            for i, (block, block_rows) in enumerate(StorageEngine._split_chunks(serializer, merged, balanced=not appending, records=merged_records)):
+                n_blocks = max(1, (len(block) + BLOCK_SIZE - 1) // BLOCK_SIZE)
+                if i == 0 and old_entry is not None and n_blocks <= old_entry[3]:
+                    block_idx, n_blocks = old_entry[2], old_entry[3]
+                    reused = True
+                else:
+                    block_idx = index.allocate(n_blocks, 1 + file_io.get_last_block_index())
+                file_io.write(block_idx, block.ljust(n_blocks * BLOCK_SIZE, b'\x00'))
+                new_entries.append(index.entry(block_rows, block_idx, n_blocks, len(block)))
+
+            if old_entry is not None and not reused:
+                file_io.write(old_entry[2], b"".ljust(old_entry[3] * BLOCK_SIZE, b'\x00'))
+                index.release(old_entry[2], old_entry[3])
+
+            if pos >= 0:
+                index.blocks[pos:pos + 1] = new_entries
+            else:
+                index.blocks = new_entries
+            res += len(new_rows)
+
+        index.save()
+        return res
+
+    def _recluster(file_io: IO, serializer: Serializer, index: ClusteredIndex | None) -> tuple[int, int]:
+        """
+        Rewrite seluruh tabel dari blok 0, kalau clustered diurutkan berdasarkan key dan FSM dibangun ulang.
+        Returns (rows read, rows written)
+        """
+        rows : list[list] = []
+        for _, _, data in StorageEngine._read_chunks(file_io, serializer, StorageEngine._sequential_search(file_io)):
+            rows.extend(data)
+
+        if index is not None:
+            rows.sort(key=lambda row: row[index.key_idx])
+            index.clear()
+
+        # Tulis ke file sementara lalu os.replace, file data lama tetap utuh kalau proses gagal di tengah
+        tmp_io = IO(file_io.file_path + ".tmp", file_io.profile)
+        if os.path.exists(tmp_io.file_path):
+            os.remove(tmp_io.file_path)
+        written : int = StorageEngine._pack_rows(tmp_io, serializer, rows, 0, index)
+        if not os.path.exists(tmp_io.file_path):  # tabel kosong
+            open(tmp_io.file_path, "wb").close()
+
+        # FSM lama dihapus sebelum file data diganti: kalau gagal di antaranya, FSM hilang (aman, tinggal defragment lagi)
+        # bukan FSM yang gak cocok sama isi file
+        if index is not None and os.path.exists(index.path):
+            os.remove(index.path)
+        os.replace(tmp_io.file_path, file_io.file_path)
+
+        if index is not None:
+            index.save()
+        return len(rows), written
+
     # def update_stats
 
 
@@ -270,4 +479,58 @@ class StorageEngine:
         """
         Returns an iterator over all the table block indices
         """
-        yield from range(1 + file_io.get_last_block_index())
\ No newline at end of file
+        yield from range(1 + file_io.get_last_block_index())
+
+    # Algorithm A4: Clustered (primary) index, comparison
+    def _clustered_search(index: ClusteredIndex, conditions: list[Condition], match_all: bool = True) -> Iterator[int]:
+        """
+        Returns an iterator over block indices yang mungkin berisi row, urut berdasarkan cluster key.
+        match_all - kondisi di AND (read_block), kalau False di OR (delete_block).
+        Tanpa kondisi yang bisa mempersempit range tetap full scan, tapi hasilnya terurut
+        """
+        if not match_all:
+            # OR: range gabungan, cuma bisa dipersempit kalau semua kondisi range pada cluster key
+            if not conditions or any(condition.column != index.key or condition.operation == Operation.NEQ for condition in conditions):
+                yield from index.range_search()
+                return
+            lows : list = [condition.operand if condition.operation in (Operation.EQ, Operation.GT, Operation.GTE) else None for condition in conditions]
+            highs : list = [condition.operand if condition.operation in (Operation.EQ, Operation.LT, Operation.LTE) else None for condition in conditions]
+            lo : Any = None if None in lows else min(lows)
+            hi : Any = None if None in highs else max(highs)
+            yield from index.range_search(lo, hi)
+            return
+
+        lo : Any = None
+        hi : Any = None
+        for condition in conditions:
+            if condition.column != index.key:
+                continue
+            if condition.operation in (Operation.EQ, Operation.GT, Operation.GTE):
+                lo = condition.operand if lo is None else max(lo, condition.operand)
+            if condition.operation in (Operation.EQ, Operation.LT, Operation.LTE):
+                hi = condition.operand if hi is None else min(hi, condition.operand)
+        yield from index.range_search(lo, hi)
+
+    def _read_chunks(file_io: IO, serializer: Serializer, block_idx_gen: Iterator[int]) -> Iterator[tuple[int, int, list[list]]]:
+        """
+        Returns an iterator of (start block index, number of blocks, rows) per chunk.
+        Chunk bisa lebih dari satu blok kalau ada row yang melebihi block size
+        """
+        idx = next(block_idx_gen, None)
+        while idx is not None:
+            chunk : bytes = file_io.read(idx)
+            if not chunk:  # EOF
+                break
+            start_idx : int = idx
+            while True:
+                try:
+                    rows = serializer.deserialize(chunk)
+                    break
+                except SerializerIncompleteBlockException as e:
+                    for _ in range(e.additional_needed_blocks):
+                        idx = next(block_idx_gen, None)
+                        if idx is None: # Abnormal
+                            return
+                        chunk += file_io.read(idx)
+            yield start_idx, idx - start_idx + 1, rows
+            idx = next(block_idx_gen, None)
\ No newline at end of file
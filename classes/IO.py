@@ -6,24 +6,45 @@ Ini class paling "low level" yang cuma ngebaca dan menulis ke blok
 """
 
 from classes.globals import BLOCK_SIZE
+from classes.Metrics import QueryProfile
 import os
+import time
 
 class IO:
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, profile: QueryProfile | None = None):
         self.file_path = file_path
+        self.profile = profile
 
     def read(self, block_idx: int) -> bytes:
-        with open(self.file_path, "rb") as f:
-            f.seek(BLOCK_SIZE * block_idx)
-            return f.read(BLOCK_SIZE)
+        start = time.perf_counter() if self.profile is not None else 0.0
+        try:
+            with open(self.file_path, "rb") as f:
+                f.seek(BLOCK_SIZE * block_idx)
+                data = f.read(BLOCK_SIZE)
+        except FileNotFoundError:   # tabel belum pernah ditulis
+            return b""
+        if self.profile is not None:
+            self.profile.add_time("io_read", time.perf_counter() - start)
+            if data:
+                self.profile.blocks_read += 1
+                self.profile.bytes_read += len(data)
+        return data
 
     def write(self, block_idx: int, data: bytes) -> int:
         """
-        data - serialized data
+        data - serialized data, di pad sampai kelipatan BLOCK_SIZE
         """
-        with open(self.file_path, "wb") as f:
+        n_blocks : int = max(1, (len(data) + BLOCK_SIZE - 1) // BLOCK_SIZE)
+        mode : str = "r+b" if os.path.exists(self.file_path) else "wb"   # "wb" bakal truncate file
+        start = time.perf_counter() if self.profile is not None else 0.0
+        with open(self.file_path, mode) as f:
             f.seek(BLOCK_SIZE * block_idx)
-            return f.write(data.ljust(BLOCK_SIZE, b'\x00'))
+            length = f.write(data.ljust(n_blocks * BLOCK_SIZE, b'\x00'))
+        if self.profile is not None:
+            self.profile.add_time("io_write", time.perf_counter() - start)
+            self.profile.blocks_written += n_blocks
+            self.profile.bytes_written += length
+        return length
 
     def delete(self, block_idx: int) -> int:
         """
@@ -37,5 +58,7 @@ class IO:
         """
         get the index of the last block in file
         """
+        if not os.path.exists(self.file_path):
+            return -1
         stat = os.stat(self.file_path)  # From os metadata
         return (stat.st_size - 1) // BLOCK_SIZE
\ No newline at end of file
@@ -1,3 +1,119 @@
 """
-TODO
-"""
\ No newline at end of file
+Indexing.py
+
+Clustered organization: row di tabel disimpan terurut berdasarkan cluster key.
+ClusteredIndex nyimpan free-space map (FSM) di file sidecar "<table>.fsm" di samping file data:
+    blocks - chunk yang terisi, urut berdasarkan key: [min_key, max_key, block_idx, n_blocks, used_bytes]
+    free   - chunk kosong yang bisa dipakai ulang waktu page split: [block_idx, n_blocks]
+
+Urutan logis ada di FSM, urutan fisik di file bisa berantakan setelah page split.
+Defragment nge-recluster ulang jadi chunk fisiknya kembali contiguous sesuai urutan key.
+"""
+
+from bisect import bisect_left
+from typing import Any, Dict, Iterator
+import json
+import os
+
+def fsm_path(file_path: str) -> str:
+    """
+        Path file FSM untuk file data tabel
+    """
+    return os.path.splitext(file_path)[0] + ".fsm"
+
+class ClusteredIndex:
+    def __init__(self, file_path: str, key: str, key_idx: int) -> None:
+        self.path : str = fsm_path(file_path)
+        self.key = key
+        self.key_idx = key_idx
+        self.blocks : list[list] = []
+        self.free : list[list] = []
+        self.exists : bool = os.path.exists(self.path)
+
+        if self.exists:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            self.blocks = data["blocks"]
+            self.free = sorted(data["free"])
+
+    def save(self) -> None:
+        with open(self.path, "w") as f:
+            json.dump({"cluster_key": self.key, "blocks": self.blocks, "free": self.free}, f)
+        self.exists = True
+
+    def clear(self) -> None:
+        self.blocks = []
+        self.free = []
+
+    def entry(self, rows: list[list], block_idx: int, n_blocks: int, used_bytes: int) -> list:
+        """
+            rows harus sudah terurut berdasarkan key
+        """
+        return [rows[0][self.key_idx], rows[-1][self.key_idx], block_idx, n_blocks, used_bytes]
+
+    def group(self, rows: list[list]) -> Dict[int, list[list]]:
+        """
+            rows harus sudah terurut berdasarkan key. Returns posisi entry -> rows yang harus di insert ke chunk itu,
+            posisi -1 kalau tabel masih kosong. Row dan entry di walk barengan dalam satu pass
+        """
+        if not self.blocks:
+            return {-1: rows} if rows else {}
+
+        groups : Dict[int, list[list]] = {}
+        pos : int = 0
+        for row in rows:
+            key = row[self.key_idx]
+            # entry terakhir yang min_key <= key, key yang lebih kecil dari semua masuk ke entry pertama
+            while pos + 1 < len(self.blocks) and self.blocks[pos + 1][0] <= key:
+                pos += 1
+            groups.setdefault(pos, []).append(row)
+        return groups
+
+    def positions(self) -> Dict[int, int]:
+        """
+            Returns block_idx awal chunk -> posisi entry di blocks
+        """
+        return {entry[2]: pos for pos, entry in enumerate(self.blocks)}
+
+    def range_search(self, lo: Any = None, hi: Any = None) -> Iterator[int]:
+        """
+            Returns an iterator over block indices (urut key) yang mungkin berisi key di [lo, hi].
+            None berarti gak ada batas
+        """
+        start : int = 0
+        if lo is not None:
+            # bisect_left, entry sebelumnya bisa punya max_key == lo (duplikat yang kena split)
+            start = max(bisect_left([entry[0] for entry in self.blocks], lo) - 1, 0)
+        for min_key, max_key, block_idx, n_blocks, _ in self.blocks[start:]:
+            if hi is not None and min_key > hi:
+                break
+            if lo is not None and max_key < lo:
+                continue
+            yield from range(block_idx, block_idx + n_blocks)
+
+    def allocate(self, n_blocks: int, end_block_idx: int) -> int:
+        """
+            Ambil chunk kosong dari free list (first fit), kalau gak ada append di akhir file (end_block_idx)
+        """
+        for i, (block_idx, free_blocks) in enumerate(self.free):
+            if free_blocks >= n_blocks:
+                if free_blocks == n_blocks:
+                    del self.free[i]
+                else:
+                    self.free[i] = [block_idx + n_blocks, free_blocks - n_blocks]
+                return block_idx
+        return end_block_idx
+
+    def release(self, block_idx: int, n_blocks: int) -> None:
+        """
+            Free list dijaga terurut block_idx, run yang bersebelahan digabung
+        """
+        pos : int = bisect_left(self.free, [block_idx, n_blocks])
+        self.free.insert(pos, [block_idx, n_blocks])
+
+        if pos + 1 < len(self.free) and self.free[pos][0] + self.free[pos][1] == self.free[pos + 1][0]:
+            self.free[pos][1] += self.free[pos + 1][1]
+            del self.free[pos + 1]
+        if pos > 0 and self.free[pos - 1][0] + self.free[pos - 1][1] == self.free[pos][0]:
+            self.free[pos - 1][1] += self.free[pos][1]
+            del self.free[pos]
@@ -0,0 +1,114 @@
+"""
+Metrics.py
+
+Counter dan timer untuk hot path storage engine (IO, Serializer, evaluasi predicate).
+Default disabled: Metrics.start() return None dan semua instrumentation cuma ngecek `profile is not None`.
+
+Pemakaian:
+    Metrics.enable()
+    engine.read_block(...)
+    engine.last_profile.to_dict()   # profile query terakhir
+    Metrics.snapshot()              # agregat global semua query sejak reset
+"""
+
+from typing import Dict
+import time
+
+class QueryProfile:
+    """
+        Profile satu panggilan StorageEngine. timings nyimpan detik per phase:
+            io_read, io_write, deserialize, serialize, predicate, total
+    """
+    __slots__ = [
+        'operation', 'table', 'start',
+        'blocks_read', 'blocks_written', 'bytes_read', 'bytes_written', 'bytes_decoded',
+        'rows_examined', 'rows_returned', 'rows_written', 'rows_deleted', 'cache_hits', 'cache_misses',
+        'timings'
+    ]
+    COUNTERS = (
+        'blocks_read', 'blocks_written', 'bytes_read', 'bytes_written', 'bytes_decoded',
+        'rows_examined', 'rows_returned', 'rows_written', 'rows_deleted', 'cache_hits', 'cache_misses'
+    )
+
+    def __init__(self, operation: str, table: str) -> None:
+        self.operation = operation
+        self.table = table
+        self.start : float = time.perf_counter()
+        self.blocks_read : int = 0
+        self.blocks_written : int = 0
+        self.bytes_read : int = 0
+        self.bytes_written : int = 0
+        self.bytes_decoded : int = 0
+        self.rows_examined : int = 0
+        self.rows_returned : int = 0
+        self.rows_written : int = 0
+        self.rows_deleted : int = 0
+        self.cache_hits : int = 0
+        self.cache_misses : int = 0
+        self.timings : Dict[str, float] = {}
+
+    def add_time(self, phase: str, seconds: float) -> None:
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+    def merge(self, other: "QueryProfile") -> None:
+        for counter in QueryProfile.COUNTERS:
+            setattr(self, counter, getattr(self, counter) + getattr(other, counter))
+        for phase, seconds in other.timings.items():
+            self.add_time(phase, seconds)
+
+    def to_dict(self) -> Dict:
+        return {
+            "operation": self.operation,
+            "table": self.table,
+            **{counter: getattr(self, counter) for counter in QueryProfile.COUNTERS},
+            "timings": dict(self.timings),
+        }
+
+    def __repr__(self) -> str:
+        return f"<QueryProfile {self.operation} {self.table} total={self.timings.get('total', 0.0):.6f}s>"
+
+class Metrics:
+    """
+        Agregat global. Semua method classmethod, state di level class (satu per proses)
+    """
+    enabled : bool = False
+    aggregate : QueryProfile = QueryProfile("all", "all")
+    queries : Dict[str, int] = {}
+
+    @classmethod
+    def enable(cls) -> None:
+        cls.enabled = True
+
+    @classmethod
+    def disable(cls) -> None:
+        cls.enabled = False
+
+    @classmethod
+    def reset(cls) -> None:
+        cls.aggregate = QueryProfile("all", "all")
+        cls.queries = {}
+
+    @classmethod
+    def start(cls, operation: str, table: str) -> QueryProfile | None:
+        if not cls.enabled:
+            return None
+        return QueryProfile(operation, table)
+
+    @classmethod
+    def finish(cls, profile: QueryProfile | None) -> QueryProfile | None:
+        """
+            Catat total time lalu merge ke agregat global
+        """
+        if profile is None:
+            return None
+        profile.add_time("total", time.perf_counter() - profile.start)
+        cls.aggregate.merge(profile)
+        cls.queries[profile.operation] = cls.queries.get(profile.operation, 0) + 1
+        return profile
+
+    @classmethod
+    def snapshot(cls) -> Dict:
+        return {
+            "queries": dict(cls.queries),
+            **cls.aggregate.to_dict(),
+        }
@@ -1,9 +1,12 @@
 import json
+import os
 import struct
+import time
 from typing import Any, List, Dict
 from classes.globals import CATALOG_FILE
 
 from classes.IO import IO
+from classes.Metrics import QueryProfile
 from classes.globals import ROW_HEADER, BLOCK_SIZE
 
 class SerializerIncompleteBlockException(Exception):
@@ -12,18 +15,42 @@ class SerializerIncompleteBlockException(Exception):
         self.additional_needed_blocks = additional_needed_blocks
 
 class Serializer:
-    def __init__(self):
-        self.schema : Dict = {}
-        self.json : Dict = json.load(open(CATALOG_FILE, "r"))
-
+    # Catalog di cache per proses, di load ulang kalau file catalog berubah (inode/mtime/size)
+    _catalog_cache : Dict | None = None
+    _catalog_key : tuple | None = None
 
+    def __init__(self, profile: QueryProfile | None = None):
+        self.schema : Dict = {}
+        self.profile = profile
+        self.json : Dict = Serializer._load_catalog(profile)
+
+    def _load_catalog(profile: QueryProfile | None = None) -> Dict:
+        stat = os.stat(CATALOG_FILE)
+        key : tuple = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if Serializer._catalog_cache is not None and Serializer._catalog_key == key:
+            if profile is not None:
+                profile.cache_hits += 1
+            return Serializer._catalog_cache
+
+        if profile is not None:
+            profile.cache_misses += 1
+        with open(CATALOG_FILE, "r") as f:
+            Serializer._catalog_cache = json.load(f)
+        Serializer._catalog_key = key
+        return Serializer._catalog_cache
+
+    def invalidate_catalog() -> None:
+        """
+            Dipanggil setelah catalog ditulis (create/drop table)
+        """
+        Serializer._catalog_cache = None
+        Serializer._catalog_key = None
 
     def load_schema(self, table_name : str) -> None:
         """
             Loads a schema from json file into the schema attribute based on table name
         """
         self.schema = self.json[table_name]
-        print(self.schema)
 
 
 
@@ -47,6 +74,7 @@ class Serializer:
         if (not self.schema or self.schema == None):
             return b"\xde\xad\xc0\xde"
 
+        start = time.perf_counter() if self.profile is not None else 0.0
         bytes_data : list[bytes] = [] # menyimpan setiap row sebagai bytes
 
         for tuple in data_list:
@@ -70,7 +98,7 @@ class Serializer:
                     if len(packed_value) > column_length:
                         packed_value = packed_value[:column_length]
                     else:
-                        packed_value = packed_value.ljust(column_length, '\x00')
+                        packed_value = packed_value.ljust(column_length, b'\x00')
                     
                     prepared_values.append(packed_value)
                 
@@ -92,25 +120,47 @@ class Serializer:
             row_header : bytes = struct.pack(ROW_HEADER, b'A', tuple_length)
             bytes_data.append(row_header + tuple_data)
 
+        if self.profile is not None:
+            self.profile.add_time("serialize", time.perf_counter() - start)
         return b''.join(bytes_data)
 
 
 
-    def deserialize(self, raw_data: bytes) -> list[list]:
+    def deserialize(self, raw_data: bytes, records: list[bytes] | None = None, n_columns: int | None = None) -> list[list]:
+        """
+            records - kalau diisi, raw bytes (header + data) tiap row yang hidup ikut di append,
+            buat nulis ulang row tanpa serialize lagi
+            n_columns - cuma decode n kolom pertama tiap row (misal sampai cluster key)
+        """
         if (not self.schema or self.schema == None):
             return b"\xde\xad\xc0\xde"
 
+        if self.profile is None:
+            return self._deserialize(raw_data, records, n_columns)
+
+        start = time.perf_counter()
+        try:
+            return self._deserialize(raw_data, records, n_columns)
+        finally:
+            self.profile.add_time("deserialize", time.perf_counter() - start)
+            self.profile.bytes_decoded += len(raw_data)
+
+    def _deserialize(self, raw_data: bytes, records: list[bytes] | None = None, n_columns: int | None = None) -> list[list]:
         pointer : int = 0
         data : list[list] = []  # list of rows
         header_size : int = struct.calcsize(ROW_HEADER)
 
         while pointer < len(raw_data):
         # === HEADER PROCESSING
+            if raw_data[pointer] == 0:  # sisa blok cuma padding
+                break
+
             if pointer + header_size > len(raw_data):
                 missing = pointer + header_size - len(raw_data)
                 needed_blocks = (missing + BLOCK_SIZE - 1) // BLOCK_SIZE
                 raise SerializerIncompleteBlockException(needed_blocks)
 
+            row_start : int = pointer
             tuple_header : bytes = raw_data[pointer : pointer+header_size]
             delete_flag, tuple_length = struct.unpack(ROW_HEADER, tuple_header)
             pointer += header_size
@@ -130,7 +180,7 @@ class Serializer:
 
             tuple_pointer : int = 0
             tuple : list = []
-            for col in self.schema['columns']:
+            for col in self.schema['columns'][:n_columns]:
                 if col['type'] == 'int':
                     value : int = struct.unpack('<i', tuple_data[tuple_pointer : tuple_pointer + 4])[0]
                     tuple.append(value)
@@ -157,6 +207,8 @@ class Serializer:
                     tuple_pointer += str_length
 
             data.append(tuple)
+            if records is not None:
+                records.append(raw_data[row_start : pointer])
         return data
     
 